@@ -3,13 +3,14 @@ Configuration management for Splunk MCP Server
 """
 
 import os
+from functools import cached_property
 from typing import Optional
 from dataclasses import dataclass
 
 
-@dataclass
+@dataclass(frozen=True)
 class SplunkConfig:
-    """Splunk connection configuration"""
+    """Splunk connection configuration (immutable once created)"""
     
     host: str
     port: int = 8089
@@ -19,6 +20,8 @@ class SplunkConfig:
     token: Optional[str] = None
     verify_ssl: bool = True
     timeout: int = 30
+    max_connections: int = 16
+    validate_token_on_connect: bool = False
     
     @classmethod
     def from_env(cls) -> "SplunkConfig":
@@ -52,6 +55,12 @@ class SplunkConfig:
         # Timeout (default: 30 seconds)
         timeout = int(os.getenv("SPLUNK_TIMEOUT", "30"))
         
+        # Connection pool size (default: 16)
+        max_connections = int(os.getenv("SPLUNK_MAX_CONNECTIONS", "16"))
+        
+        # Eager token validation on connect (default: False)
+        validate_token_on_connect = os.getenv("SPLUNK_VALIDATE_TOKEN", "false").lower() in ("true", "1", "yes")
+        
         return cls(
             host=host,
             port=port,
@@ -60,7 +69,9 @@ class SplunkConfig:
             password=password,
             token=token,
             verify_ssl=verify_ssl,
-            timeout=timeout
+            timeout=timeout,
+            max_connections=max_connections,
+            validate_token_on_connect=validate_token_on_connect
         )
     
     def __post_init__(self):
@@ -73,8 +84,11 @@ class SplunkConfig:
         
         if self.port < 1 or self.port > 65535:
             raise ValueError("Port must be between 1 and 65535")
+        
+        if self.max_connections < 1:
+            raise ValueError("max_connections must be at least 1")
     
-    @property
+    @cached_property
     def base_url(self) -> str:
         """Get the base URL for Splunk API"""
         return f"{self.scheme}://{self.host}:{self.port}"
@@ -90,6 +104,8 @@ class SplunkConfig:
             f"password={'***' if self.password else None}, "
             f"token={'***' if self.token else None}, "
             f"verify_ssl={self.verify_ssl}, "
-            f"timeout={self.timeout}"
+            f"timeout={self.timeout}, "
+            f"max_connections={self.max_connections}, "
+            f"validate_token_on_connect={self.validate_token_on_connect}"
             f")"
         )
@@ -21,8 +21,34 @@ logger = logging.getLogger(__name__)
 # Initialize MCP server
 mcp = FastMCP("Splunk MCP Server")
 
-# Global Splunk client instance
+# Global Splunk client instance, created lazily by get_client()
 splunk_client: Optional[SplunkClient] = None
+# Created on first use: on Python < 3.10 a Lock binds to the event loop
+# current at construction, which is not the one asyncio.run() starts
+_client_lock: Optional[asyncio.Lock] = None
+
+
+async def get_client() -> SplunkClient:
+    """Return the shared Splunk client, connecting on first use"""
+    global splunk_client, _client_lock
+    
+    if splunk_client is None:
+        if _client_lock is None:
+            _client_lock = asyncio.Lock()
+        async with _client_lock:
+            if splunk_client is None:
+                client = SplunkClient(SplunkConfig.from_env())
+                try:
+                    await client.connect()
+                except Exception as e:
+                    logger.error(f"Failed to initialize Splunk client: {str(e)}")
+                    await client.close()
+                    raise
+                
+                splunk_client = client
+                logger.info("Splunk client initialized successfully")
+    
+    return splunk_client
 
 
 @mcp.tool()
@@ -36,27 +62,27 @@ async def search_splunk(request: SearchRequest) -> Dict[str, Any]:
     Returns:
         Dictionary containing search results and metadata
     """
-    global splunk_client
-    
-    if not splunk_client:
-        raise RuntimeError("Splunk client not initialized. Please configure connection first.")
+    client = await get_client()
     
     try:
         logger.info(f"Executing Splunk search: {request.query}")
         
-        results = await splunk_client.search(
+        results = await client.search(
             query=request.query,
             earliest_time=request.earliest_time,
             latest_time=request.latest_time,
             max_count=request.max_count,
-            timeout=request.timeout
+            timeout=request.timeout,
+            cacheable=request.cacheable
         )
         
+        search_results = results.get("results", [])
+        
         return {
             "status": "success",
             "query": request.query,
-            "result_count": len(results.get("results", [])),
-            "results": results.get("results", []),
+            "result_count": len(search_results),
+            "results": search_results,
             "messages": results.get("messages", []),
             "search_time": results.get("search_time"),
             "earliest_time": request.earliest_time,
@@ -83,15 +109,12 @@ async def list_indexes(request: IndexRequest) -> Dict[str, Any]:
     Returns:
         Dictionary containing list of indexes and metadata
     """
-    global splunk_client
-    
-    if not splunk_client:
-        raise RuntimeError("Splunk client not initialized. Please configure connection first.")
+    client = await get_client()
     
     try:
         logger.info("Listing Splunk indexes")
         
-        indexes = await splunk_client.list_indexes(pattern=request.pattern)
+        indexes = await client.list_indexes(pattern=request.pattern)
         
         return {
             "status": "success",
@@ -119,15 +142,12 @@ async def list_saved_searches(request: SavedSearchRequest) -> Dict[str, Any]:
     Returns:
         Dictionary containing saved searches and metadata
     """
-    global splunk_client
-    
-    if not splunk_client:
-        raise RuntimeError("Splunk client not initialized. Please configure connection first.")
+    client = await get_client()
     
     try:
         logger.info("Listing saved searches")
         
-        saved_searches = await splunk_client.list_saved_searches(
+        saved_searches = await client.list_saved_searches(
             search_name=request.search_name,
             owner=request.owner
         )
@@ -157,15 +177,12 @@ async def list_apps(request: AppRequest) -> Dict[str, Any]:
     Returns:
         Dictionary containing list of applications
     """
-    global splunk_client
-    
-    if not splunk_client:
-        raise RuntimeError("Splunk client not initialized. Please configure connection first.")
+    client = await get_client()
     
     try:
         logger.info("Listing Splunk applications")
         
-        apps = await splunk_client.list_apps(visible_only=request.visible_only)
+        apps = await client.list_apps(visible_only=request.visible_only)
         
         return {
             "status": "success",
@@ -189,15 +206,12 @@ async def get_server_info() -> Dict[str, Any]:
     Returns:
         Dictionary containing server information
     """
-    global splunk_client
-    
-    if not splunk_client:
-        raise RuntimeError("Splunk client not initialized. Please configure connection first.")
+    client = await get_client()
     
     try:
         logger.info("Getting Splunk server information")
         
-        server_info = await splunk_client.get_server_info()
+        server_info = await client.get_server_info()
         
         return {
             "status": "success",
@@ -212,28 +226,10 @@ async def get_server_info() -> Dict[str, Any]:
         }
 
 
-async def initialize_splunk_client():
-    """Initialize the Splunk client with configuration"""
-    global splunk_client
-    
-    try:
-        config = SplunkConfig.from_env()
-        splunk_client = SplunkClient(config)
-        await splunk_client.connect()
-        logger.info("Splunk client initialized successfully")
-        
-    except Exception as e:
-        logger.error(f"Failed to initialize Splunk client: {str(e)}")
-        raise
-
-
 async def main():
     """Main entry point for the MCP server"""
     try:
-        # Initialize Splunk client
-        await initialize_splunk_client()
-        
-        # Run the MCP server
+        # Run the MCP server; the Splunk client connects on the first tool call
         await mcp.run()
         
     except KeyboardInterrupt:
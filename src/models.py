@@ -3,12 +3,14 @@ Pydantic models for Splunk MCP Server requests and responses
 """
 
 from typing import Any, Dict, List, Optional
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from datetime import datetime
 
 
 class SearchRequest(BaseModel):
     """Search request parameters"""
+    model_config = ConfigDict(str_strip_whitespace=True, frozen=True)
+    
     query: str = Field(..., description="SPL (Search Processing Language) query")
     earliest_time: Optional[str] = Field(
         default="-24h@h", 
@@ -30,12 +32,18 @@ class SearchRequest(BaseModel):
         ge=1,
         le=3600
     )
+    cacheable: Optional[bool] = Field(
+        default=False,
+        description="Reuse results of an identical search run in the last few seconds"
+    )
 
-    @validator('query')
-    def validate_query(cls, v):
-        if not v or not v.strip():
+    @field_validator('query', mode='after')
+    @classmethod
+    def validate_query(cls, v: str) -> str:
+        # Whitespace is already stripped by str_strip_whitespace
+        if not v:
             raise ValueError('Query cannot be empty')
-        return v.strip()
+        return v
 
 
 class IndexRequest(BaseModel):
@@ -75,8 +83,7 @@ class SearchResult(BaseModel):
     sourcetype: Optional[str] = None
     index: Optional[str] = None
     
-    class Config:
-        extra = "allow"  # Allow additional fields from Splunk results
+    model_config = ConfigDict(extra="allow")  # Allow additional fields from Splunk results
 
 
 class SearchResponse(BaseModel):
@@ -4,20 +4,125 @@ Handles authentication and API interactions with Splunk Enterprise/Cloud
 """
 
 import asyncio
+import fnmatch
+import functools
 import json
 import logging
+import re
+import ssl
 import time
-from typing import Any, Dict, List, Optional
-from urllib.parse import urljoin
-import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from operator import itemgetter
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 import aiohttp
-import xmltodict
+from multidict import MultiDict
+from yarl import URL
 
 from config import SplunkConfig
 
+try:
+    # orjson decodes large search/result payloads several times faster
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 logger = logging.getLogger(__name__)
 
+# Content fields requested from /services/data/indexes; everything else the
+# endpoint returns per index is dropped server-side
+_INDEX_FIELDS = ("currentDBSizeMB", "maxDataSize", "totalEventCount", "disabled")
+
+# Shared read-only default for missing entry sections, so row parsing does
+# not allocate a throwaway dict for every .get() fallback
+_EMPTY: MappingProxyType = MappingProxyType({})
+
+
+def _make_parser(fields: Dict[str, Tuple[str, Any]]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """Generate a function that flattens one REST API entry into a row dict
+    
+    ``fields`` maps each output key to ``(source, default)``, where source is
+    either an entry-level key (``"name"``) or ``"<section>.<key>"`` for a key
+    nested one level down (``"content.disabled"``, ``"acl.app"``). The
+    generated function looks every section up once and builds the row in a
+    single dict literal, in the same way ``collections.namedtuple`` compiles
+    its class body.
+    """
+    sections: Dict[str, str] = {}
+    defaults: Dict[str, Any] = {}
+    items = []
+    for i, (key, (source, default)) in enumerate(fields.items()):
+        section, _, name = source.rpartition(".")
+        if section and section not in sections:
+            sections[section] = f"_s{len(sections)}"
+        defaults[f"_d{i}"] = default
+        items.append(f"{key!r}: {sections.get(section, 'entry')}.get({name!r}, _d{i})")
+        
+    args = ", ".join(["entry", "_empty=_empty"] + [f"{arg}={arg}" for arg in defaults])
+    lookups = "".join(
+        f"    {local} = entry.get({section!r}, _empty)\n" for section, local in sections.items()
+    )
+    code = f"def parse({args}):\n{lookups}    return {{{', '.join(items)}}}\n"
+    
+    namespace = {"_empty": _EMPTY, **defaults}
+    exec(code, namespace)
+    return namespace["parse"]
+
+
+_parse_index = _make_parser({
+    "name": ("name", ""),
+    "currentDBSizeMB": ("content.currentDBSizeMB", 0),
+    "maxDataSize": ("content.maxDataSize", "auto"),
+    "totalEventCount": ("content.totalEventCount", 0),
+    "disabled": ("content.disabled", False),
+})
+
+_parse_saved_search = _make_parser({
+    "name": ("name", ""),
+    "search": ("content.search", ""),
+    "description": ("content.description", ""),
+    "owner": ("author", ""),
+    "app": ("acl.app", ""),
+    "disabled": ("content.disabled", False),
+    "cron_schedule": ("content.cron_schedule", ""),
+    "next_scheduled_time": ("content.next_scheduled_time", ""),
+})
+
+_parse_app = _make_parser({
+    "name": ("name", ""),
+    "label": ("content.label", ""),
+    "description": ("content.description", ""),
+    "version": ("content.version", ""),
+    "author": ("author", ""),
+    "disabled": ("content.disabled", False),
+    "configured": ("content.configured", False),
+})
+
+_parse_server_info = _make_parser({
+    key: (f"content.{key}", "")
+    for key in (
+        "version", "build", "serverName", "host",
+        "product_type", "license_state", "mode", "startup_time",
+    )
+})
+
+
+@functools.lru_cache(maxsize=2)
+def _ssl_context(verify: bool) -> ssl.SSLContext:
+    """Build (once per verify mode) the SSL context used for HTTPS connections"""
+    context = ssl.create_default_context()
+    if not verify:
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+def _copy_search_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy a cached search result so callers cannot mutate the cached one"""
+    return {**result, "results": [dict(row) for row in result["results"]]}
+
 
 class SplunkClient:
     """Async Splunk REST API client"""
@@ -26,24 +131,43 @@ class SplunkClient:
         self.config = config
         self.session: Optional[aiohttp.ClientSession] = None
         self.session_key: Optional[str] = None
-        self.base_url = f"{config.scheme}://{config.host}:{config.port}"
+        self.base_url = config.base_url
+        self._base = URL(config.base_url)
+        self._cleanup_tasks: Set[asyncio.Task] = set()
+        
+        # Short-lived caches for data that rarely changes while we run
+        self._server_info_cache: Optional[Dict[str, Any]] = None
+        self._server_info_cache_at = 0.0
+        self._server_info_ttl = 60.0
+        self._apps_cache: Dict[bool, Tuple[float, List[Dict[str, Any]]]] = {}
+        self._apps_ttl = 300.0
+        
+        # Recent results of searches run with cacheable=True
+        self._search_lru: "OrderedDict[Tuple[str, str, str, int], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._search_lru_max = 64
+        self._search_lru_ttl = 10.0
         
     async def connect(self):
         """Establish connection and authenticate with Splunk"""
         if self.session:
+            # Pending search job cleanups still need the old session
+            await self._wait_for_cleanup()
             await self.session.close()
             
-        # Create SSL context for HTTPS
-        ssl_context = None
-        if self.config.scheme == "https":
-            import ssl
-            ssl_context = ssl.create_default_context()
-            if not self.config.verify_ssl:
-                ssl_context.check_hostname = False
-                ssl_context.verify_mode = ssl.CERT_NONE
+        # Reuse the cached SSL context for HTTPS
+        ssl_context = _ssl_context(self.config.verify_ssl) if self.config.scheme == "https" else None
         
-        # Create session with appropriate settings
-        connector = aiohttp.TCPConnector(ssl=ssl_context)
+        # Create session with appropriate settings. All requests go to a single
+        # host, so size the pool per host and keep idle connections alive long
+        # enough for a search's create/poll/results/delete sequence to reuse
+        # one TLS connection.
+        connector = aiohttp.TCPConnector(
+            ssl=ssl_context,
+            limit=self.config.max_connections,
+            limit_per_host=self.config.max_connections,
+            keepalive_timeout=75,
+            ttl_dns_cache=300
+        )
         timeout = aiohttp.ClientTimeout(total=self.config.timeout)
         
         self.session = aiohttp.ClientSession(
@@ -56,13 +180,28 @@ class SplunkClient:
         
     async def close(self):
         """Close the HTTP session"""
+        # Let pending search job cleanups finish before the session goes away
+        await self._wait_for_cleanup()
+            
         if self.session:
             await self.session.close()
             self.session = None
             
+    async def _wait_for_cleanup(self):
+        """Wait for background search job deletions still in flight"""
+        if self._cleanup_tasks:
+            await asyncio.gather(*self._cleanup_tasks, return_exceptions=True)
+            
+    def clear_cache(self):
+        """Drop cached server info, app listings and search results"""
+        self._server_info_cache = None
+        self._server_info_cache_at = 0.0
+        self._apps_cache.clear()
+        self._search_lru.clear()
+        
     async def _authenticate(self):
         """Authenticate with Splunk and get session key"""
-        auth_url = urljoin(self.base_url, "/services/auth/login")
+        auth_url = self._base.with_path("/services/auth/login")
         
         # Prepare authentication data
         if self.config.token:
@@ -70,8 +209,14 @@ class SplunkClient:
             headers = {"Authorization": f"Bearer {self.config.token}"}
             self.session.headers.update(headers)
             
+            # An invalid token surfaces on the first real API call, so only
+            # spend a round trip testing it when asked to fail fast
+            if not self.config.validate_token_on_connect:
+                logger.info("Token authentication configured (deferred validation)")
+                return
+                
             # Test the token by making a simple API call
-            test_url = urljoin(self.base_url, "/services/server/info")
+            test_url = self._base.with_path("/services/server/info")
             async with self.session.get(test_url) as response:
                 if response.status == 200:
                     logger.info("Token authentication successful")
@@ -89,7 +234,7 @@ class SplunkClient:
             
             async with self.session.post(auth_url, data=auth_data) as response:
                 if response.status == 200:
-                    result = await response.json()
+                    result = _json_loads(await response.read())
                     self.session_key = result["sessionKey"]
                     
                     # Update session headers with session key
@@ -109,7 +254,7 @@ class SplunkClient:
         if not self.session:
             raise Exception("Client not connected. Call connect() first.")
             
-        url = urljoin(self.base_url, endpoint)
+        url = self._base.with_path(endpoint)
         
         # Set default output mode to JSON
         if "params" not in kwargs:
@@ -122,8 +267,12 @@ class SplunkClient:
                 content_type = response.headers.get("content-type", "")
                 
                 if "application/json" in content_type:
-                    return await response.json()
+                    return _json_loads(await response.read())
                 elif "text/xml" in content_type or "application/xml" in content_type:
+                    # XML responses are rare since output_mode=json is forced,
+                    # so only import the parser when one actually arrives
+                    import xmltodict
+                    
                     xml_content = await response.text()
                     return xmltodict.parse(xml_content)
                 else:
@@ -138,10 +287,22 @@ class SplunkClient:
         earliest_time: str = "-24h@h",
         latest_time: str = "now",
         max_count: int = 100,
-        timeout: int = 60
+        timeout: int = 60,
+        cacheable: bool = False
     ) -> Dict[str, Any]:
-        """Execute a search query"""
+        """Execute a search query
+        
+        With ``cacheable=True`` an identical search that completed within the
+        last few seconds is answered from memory instead of Splunk.
+        """
         
+        if cacheable:
+            key = (query, earliest_time, latest_time, max_count)
+            hit = self._search_lru.get(key)
+            if hit and time.monotonic() - hit[0] < self._search_lru_ttl:
+                self._search_lru.move_to_end(key)
+                return _copy_search_result(hit[1])
+                
         # Create search job
         search_params = {
             "search": query,
@@ -161,64 +322,108 @@ class SplunkClient:
         logger.info(f"Created search job: {search_id}")
         
         # Wait for search to complete
-        start_time = time.time()
-        while time.time() - start_time < timeout:
-            job_status = await self._make_request(
-                "GET",
-                f"/services/search/jobs/{search_id}"
-            )
-            
-            entry = job_status["entry"][0] if "entry" in job_status else {}
-            content = entry.get("content", {})
-            
-            if content.get("dispatchState") == "DONE":
-                break
-            elif content.get("dispatchState") == "FAILED":
-                raise Exception(f"Search failed: {content.get('messages', 'Unknown error')}")
-                
-            await asyncio.sleep(1)
-        else:
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
+        try:
+            await asyncio.wait_for(self._await_job_done(search_id), timeout=timeout)
+        except asyncio.TimeoutError:
             raise Exception(f"Search timeout after {timeout} seconds")
             
-        # Get search results
+        # Get search results. json_rows sends each field name once instead of
+        # once per row, and count lifts the endpoint's default 100-row page
         results_response = await self._make_request(
             "GET",
-            f"/services/search/jobs/{search_id}/results"
+            f"/services/search/jobs/{search_id}/results",
+            params={"output_mode": "json_rows", "count": max_count}
         )
         
-        # Clean up search job
-        await self._make_request("DELETE", f"/services/search/jobs/{search_id}")
+        # Rebuild per-row dicts, omitting empty fields as output_mode=json does
+        fields = [
+            field["name"] if isinstance(field, dict) else field
+            for field in results_response.get("fields", [])
+        ]
+        results = [
+            {name: value for name, value in zip(fields, row) if value is not None}
+            for row in results_response.get("rows", [])
+        ]
         
-        return {
-            "results": results_response.get("results", []),
+        # Clean up search job in the background; the caller does not need
+        # to wait an extra round trip for it
+        task = asyncio.create_task(self._delete_search_job(search_id))
+        self._cleanup_tasks.add(task)
+        task.add_done_callback(self._cleanup_tasks.discard)
+        
+        result = {
+            "results": results,
             "messages": results_response.get("messages", []),
-            "search_time": time.time() - start_time
+            "search_time": loop.time() - start_time
         }
         
+        if cacheable:
+            self._search_lru[key] = (time.monotonic(), _copy_search_result(result))
+            self._search_lru.move_to_end(key)
+            if len(self._search_lru) > self._search_lru_max:
+                self._search_lru.popitem(last=False)
+                
+        return result
+        
+    async def _await_job_done(self, search_id: str):
+        """Poll a search job until it is DONE, raising if it FAILED
+        
+        Polls with exponential backoff so short searches return quickly and
+        long ones issue fewer requests. The caller enforces the timeout.
+        """
+        delay = 0.05
+        while True:
+            # A request timeout is an asyncio.TimeoutError too; re-raise it as
+            # something else so the caller does not take it for the search one
+            try:
+                job_status = await self._make_request(
+                    "GET",
+                    f"/services/search/jobs/{search_id}"
+                )
+            except asyncio.TimeoutError as e:
+                raise Exception(f"Request timed out while polling search job {search_id}") from e
+            
+            entry = job_status["entry"][0] if "entry" in job_status else {}
+            content = entry.get("content", _EMPTY)
+            
+            if content.get("dispatchState") == "DONE":
+                return
+            elif content.get("dispatchState") == "FAILED":
+                raise Exception(f"Search failed: {content.get('messages', 'Unknown error')}")
+                
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 2.0)
+            
+    async def _delete_search_job(self, search_id: str):
+        """Delete a finished search job, logging rather than raising on failure"""
+        try:
+            await self._make_request("DELETE", f"/services/search/jobs/{search_id}")
+        except Exception as e:
+            logger.warning(f"Failed to delete search job {search_id}: {str(e)}")
+            
     async def list_indexes(self, pattern: Optional[str] = None) -> List[Dict[str, Any]]:
         """List available indexes"""
-        response = await self._make_request("GET", "/services/data/indexes")
-        
-        indexes = []
-        for entry in response.get("entry", []):
-            index_name = entry.get("name", "")
+        # Return every index (count=0) and only the fields we use. Splunk can
+        # pre-filter by name unless the glob uses '?' or '[...]', which it does
+        # not understand; the local glob match below stays authoritative
+        params = MultiDict([("count", "0")] + [("f", field) for field in _INDEX_FIELDS])
+        if pattern and not any(char in pattern for char in '?["\\'):
+            params["search"] = f"name={pattern}"
             
+        response = await self._make_request("GET", "/services/data/indexes", params=params)
+        
+        # Translate the glob to a regex once rather than per index
+        matcher = re.compile(fnmatch.translate(pattern)).match if pattern else None
+        indexes = [
+            _parse_index(entry)
+            for entry in response.get("entry", [])
             # Apply pattern filter if provided
-            if pattern:
-                import fnmatch
-                if not fnmatch.fnmatch(index_name, pattern):
-                    continue
-                    
-            content = entry.get("content", {})
-            indexes.append({
-                "name": index_name,
-                "currentDBSizeMB": content.get("currentDBSizeMB", 0),
-                "maxDataSize": content.get("maxDataSize", "auto"),
-                "totalEventCount": content.get("totalEventCount", 0),
-                "disabled": content.get("disabled", False)
-            })
-            
-        return sorted(indexes, key=lambda x: x["name"])
+            if not matcher or matcher(entry.get("name", ""))
+        ]
+        indexes.sort(key=itemgetter("name"))
+        return indexes
         
     async def list_saved_searches(
         self,
@@ -227,74 +432,61 @@ class SplunkClient:
     ) -> List[Dict[str, Any]]:
         """List saved searches"""
         endpoint = "/services/saved/searches"
-        params = {}
+        params = {"count": "0"}
         
         if owner:
             params["owner"] = owner
+        if search_name:
+            # Escape the name so it cannot break out of the quoted search term
+            escaped = search_name.replace("\\", "\\\\").replace('"', '\\"')
+            params["search"] = f'name="*{escaped}*"'
             
         response = await self._make_request("GET", endpoint, params=params)
         
-        saved_searches = []
-        for entry in response.get("entry", []):
-            name = entry.get("name", "")
-            
-            # Filter by search name if provided
-            if search_name and search_name.lower() not in name.lower():
-                continue
-                
-            content = entry.get("content", {})
-            saved_searches.append({
-                "name": name,
-                "search": content.get("search", ""),
-                "description": content.get("description", ""),
-                "owner": entry.get("author", ""),
-                "app": entry.get("acl", {}).get("app", ""),
-                "disabled": content.get("disabled", False),
-                "cron_schedule": content.get("cron_schedule", ""),
-                "next_scheduled_time": content.get("next_scheduled_time", "")
-            })
-            
-        return sorted(saved_searches, key=lambda x: x["name"])
+        # Filter by search name if provided
+        search_name = search_name.lower() if search_name else None
+        saved_searches = [
+            _parse_saved_search(entry)
+            for entry in response.get("entry", [])
+            if not search_name or search_name in entry.get("name", "").lower()
+        ]
+        saved_searches.sort(key=itemgetter("name"))
+        return saved_searches
         
     async def list_apps(self, visible_only: bool = True) -> List[Dict[str, Any]]:
         """List installed applications"""
-        response = await self._make_request("GET", "/services/apps/local")
-        
-        apps = []
-        for entry in response.get("entry", []):
-            content = entry.get("content", {})
+        now = time.monotonic()
+        cached = self._apps_cache.get(visible_only)
+        if cached and now - cached[0] < self._apps_ttl:
+            return [dict(app) for app in cached[1]]
             
-            # Filter visible apps only if requested
-            if visible_only and content.get("visible", True) is False:
-                continue
-                
-            apps.append({
-                "name": entry.get("name", ""),
-                "label": content.get("label", ""),
-                "description": content.get("description", ""),
-                "version": content.get("version", ""),
-                "author": entry.get("author", ""),
-                "disabled": content.get("disabled", False),
-                "configured": content.get("configured", False)
-            })
+        params = {"count": "0"}
+        if visible_only:
+            params["search"] = "visible=1"
             
-        return sorted(apps, key=lambda x: x["name"])
+        response = await self._make_request("GET", "/services/apps/local", params=params)
+        
+        apps = [
+            _parse_app(entry)
+            for entry in response.get("entry", [])
+            # Filter visible apps only if requested
+            if not visible_only or entry.get("content", _EMPTY).get("visible", True) is not False
+        ]
+        apps.sort(key=itemgetter("name"))
+        self._apps_cache[visible_only] = (now, apps)
+        return [dict(app) for app in apps]
         
     async def get_server_info(self) -> Dict[str, Any]:
         """Get server information"""
+        now = time.monotonic()
+        if self._server_info_cache and now - self._server_info_cache_at < self._server_info_ttl:
+            return dict(self._server_info_cache)
+            
         response = await self._make_request("GET", "/services/server/info")
         
         if "entry" in response and len(response["entry"]) > 0:
-            content = response["entry"][0].get("content", {})
-            return {
-                "version": content.get("version", ""),
-                "build": content.get("build", ""),
-                "serverName": content.get("serverName", ""),
-                "host": content.get("host", ""),
-                "product_type": content.get("product_type", ""),
-                "license_state": content.get("license_state", ""),
-                "mode": content.get("mode", ""),
-                "startup_time": content.get("startup_time", "")
-            }
+            self._server_info_cache = _parse_server_info(response["entry"][0])
+            self._server_info_cache_at = now
+            return dict(self._server_info_cache)
         else:
             return {}
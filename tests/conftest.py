@@ -0,0 +1,104 @@
+"""
+Shared fixtures for Splunk MCP Server tests
+"""
+
+import asyncio
+import json
+import sys
+
+import pytest
+from unittest.mock import patch
+
+try:
+    import uvloop
+except ImportError:  # uvloop is optional and unavailable on Windows
+    uvloop = None
+
+
+class FakeResponse:
+    """Minimal stand-in for an aiohttp response, usable as `async with` target"""
+    
+    __slots__ = ("status", "_json", "_body", "_text")
+    
+    def __init__(self, status=200, json_body=None, text=""):
+        self.status = status
+        self._json = json_body if json_body is not None else {}
+        # Encode once; read() may be awaited many times per response
+        self._body = json.dumps(self._json).encode()
+        self._text = text
+        
+    async def __aenter__(self):
+        return self
+        
+    async def __aexit__(self, *exc_info):
+        return False
+        
+    async def read(self):
+        return self._body
+        
+    async def json(self):
+        return self._json
+        
+    async def text(self):
+        return self._text
+
+
+# Shared default reply (an empty JSON object with status 200)
+_EMPTY_OK_RESPONSE = FakeResponse()
+
+
+class FakeSession:
+    """Minimal stand-in for aiohttp.ClientSession serving one canned response"""
+    
+    __slots__ = ("headers", "response")
+    
+    def __init__(self):
+        self.headers = {}
+        self.response = _EMPTY_OK_RESPONSE
+        
+    def respond(self, status=200, json_body=None, text=""):
+        """Set the response returned by subsequent requests"""
+        if status == 200 and json_body is None and not text:
+            self.response = _EMPTY_OK_RESPONSE
+        else:
+            self.response = FakeResponse(status, json_body, text)
+        
+    def get(self, url, **kwargs):
+        return self.response
+        
+    def post(self, url, **kwargs):
+        return self.response
+        
+    async def close(self):
+        pass
+
+
+def pytest_asyncio_loop_factories(config, item):
+    """Run async tests on uvloop where available, else the default loop"""
+    if uvloop is not None and sys.platform != "win32":
+        return {"uvloop": uvloop.new_event_loop}
+    return {"asyncio": asyncio.new_event_loop}
+
+
+@pytest.fixture(scope="module")
+def _patched_aiohttp_session():
+    """Patch aiohttp.ClientSession once per module with a fake session"""
+    session = FakeSession()
+    with patch('aiohttp.ClientSession', return_value=session):
+        yield session
+
+
+@pytest.fixture(autouse=True)
+def mock_aiohttp_session(request, _patched_aiohttp_session):
+    """Provide the patched session with headers reset for every test
+    
+    The canned response is taken from a ``mock_response(status, json_body,
+    text)`` marker when the test has one, else it is an empty 200.
+    """
+    marker = request.node.get_closest_marker("mock_response")
+    _patched_aiohttp_session.headers = {}
+    if marker:
+        _patched_aiohttp_session.respond(*marker.args, **marker.kwargs)
+    else:
+        _patched_aiohttp_session.respond()
+    return _patched_aiohttp_session
@@ -0,0 +1,61 @@
+"""
+Tests for Splunk configuration
+"""
+
+import os
+
+import pytest
+
+from src.config import SplunkConfig
+
+
+class TestSplunkConfig:
+    """Test cases for SplunkConfig"""
+
+    @pytest.mark.parametrize("env,expected,match", [
+        pytest.param(
+            {
+                "SPLUNK_HOST": "test.splunk.com",
+                "SPLUNK_TOKEN": "test-token",
+                "SPLUNK_PORT": "8089",
+                "SPLUNK_SCHEME": "https",
+            },
+            {"host": "test.splunk.com", "token": "test-token", "port": 8089, "scheme": "https"},
+            None,
+            id="token",
+        ),
+        pytest.param(
+            {
+                "SPLUNK_HOST": "test.splunk.com",
+                "SPLUNK_USERNAME": "testuser",
+                "SPLUNK_PASSWORD": "testpass",
+            },
+            {"host": "test.splunk.com", "username": "testuser", "password": "testpass"},
+            None,
+            id="userpass",
+        ),
+        pytest.param({}, None, "SPLUNK_HOST environment variable is required", id="missing_host"),
+        pytest.param(
+            {"SPLUNK_HOST": "test.splunk.com"},
+            None,
+            "Either SPLUNK_TOKEN or both SPLUNK_USERNAME",
+            id="missing_auth",
+        ),
+    ])
+    def test_config_from_env(self, monkeypatch, env, expected, match):
+        """Test configuration from environment variables"""
+        for name in list(os.environ):
+            if name.startswith("SPLUNK_"):
+                monkeypatch.delenv(name)
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+            
+        if match:
+            with pytest.raises(ValueError, match=match):
+                SplunkConfig.from_env()
+            return
+            
+        config = SplunkConfig.from_env()
+        
+        for attr, value in expected.items():
+            assert getattr(config, attr) == value
@@ -2,15 +2,24 @@
 Tests for Splunk Client
 """
 
+import asyncio
+import dataclasses
+import itertools
+import logging
+from contextlib import contextmanager
+from types import MappingProxyType
+
 import pytest
-from unittest.mock import AsyncMock, MagicMock, patch
-from aiohttp import ClientSession
+import pytest_asyncio
 
 from src.config import SplunkConfig
 from src.splunk_client import SplunkClient
 
 
-@pytest.fixture
+# SplunkConfig is a frozen dataclass, so each configuration fixture is built
+# once and shared by every test that requests it
+
+@pytest.fixture(scope="session")
 def mock_config():
     """Create a mock Splunk configuration"""
     return SplunkConfig(
@@ -23,7 +32,7 @@ def mock_config():
     )
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def mock_config_userpass():
     """Create a mock Splunk configuration with username/password"""
     return SplunkConfig(
@@ -37,299 +46,432 @@ def mock_config_userpass():
     )
 
 
-@pytest.fixture
-async def splunk_client(mock_config):
-    """Create a Splunk client for testing"""
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def _shared_splunk_client(mock_config):
+    """Create one Splunk client for the whole test session"""
     client = SplunkClient(mock_config)
     yield client
-    if client.session:
-        await client.close()
+    await client.close()
+
+
+@pytest.fixture
+def splunk_client(_shared_splunk_client):
+    """Provide the shared Splunk client with its caches emptied"""
+    _shared_splunk_client.clear_cache()
+    return _shared_splunk_client
+
+
+@pytest.fixture
+def fresh_client(mock_config):
+    """Provide an unconnected client of its own to tests that connect or inspect it"""
+    return SplunkClient(mock_config)
+
+
+@contextmanager
+def swap(obj, attr, new):
+    """Temporarily replace an attribute, restoring the original afterwards"""
+    had_own = attr in vars(obj)
+    old = getattr(obj, attr)
+    setattr(obj, attr, new)
+    try:
+        yield new
+    finally:
+        if had_own:
+            setattr(obj, attr, old)
+        else:
+            delattr(obj, attr)
+
+
+def staged_requests(responses):
+    """Build a _make_request stand-in that returns staged responses in order"""
+    responses = iter(responses)
+    
+    async def fake_request(*args, **kwargs):
+        return next(responses)
+    
+    return fake_request
+
+
+# Canned REST API responses, built once at import and read-only so tests can
+# share them without copying
+
+_JOB_RESP = MappingProxyType({"sid": "test-search-id"})
+
+_JOB_DONE_RESP = MappingProxyType({
+    "entry": [{
+        "content": {"dispatchState": "DONE"}
+    }]
+})
+
+_JOB_RUNNING_RESP = MappingProxyType({
+    "entry": [{
+        "content": {"dispatchState": "RUNNING"}
+    }]
+})
+
+_SEARCH_RESULTS_RESP = MappingProxyType({
+    "fields": ["_time", "_raw", "host"],
+    "rows": [
+        ["2024-01-01T00:00:00", "test log entry", None]
+    ],
+    "messages": []
+})
+
+_EMPTY_RESP = MappingProxyType({})
+
+
+def _entries(names, contents):
+    """Pair parallel name and content tuples into REST API entry dicts"""
+    return tuple({"name": name, "content": content} for name, content in zip(names, contents))
+
+
+_MAIN_INDEXES_RESP = MappingProxyType({
+    "entry": _entries(
+        ("main", "security"),
+        (
+            {
+                "currentDBSizeMB": 1024.5,
+                "maxDataSize": "auto",
+                "totalEventCount": 100000,
+                "disabled": False
+            },
+            {
+                "currentDBSizeMB": 512.25,
+                "maxDataSize": "1GB",
+                "totalEventCount": 50000,
+                "disabled": False
+            },
+        )
+    )
+})
+
+_PATTERN_INDEX_NAMES = ("main", "security", "web_logs")
+_PATTERN_INDEXES_RESP = MappingProxyType({
+    "entry": _entries(_PATTERN_INDEX_NAMES, ({},) * len(_PATTERN_INDEX_NAMES))
+})
+
+_SAVED_SEARCHES_RESP = MappingProxyType({
+    "entry": [
+        {
+            "name": "Security Alerts",
+            "author": "admin",
+            "content": {
+                "search": "index=security error",
+                "description": "Security error monitoring",
+                "disabled": False,
+                "cron_schedule": "0 */6 * * *",
+                "next_scheduled_time": "2024-01-01T06:00:00"
+            },
+            "acl": {"app": "search"}
+        }
+    ]
+})
+
+_APPS_RESP = MappingProxyType({
+    "entry": _entries(
+        ("search", "splunk_internal"),
+        ({"label": "Search & Reporting", "visible": True}, {"label": "Internal", "visible": False})
+    )
+})
+
+_SERVER_INFO_RESP = MappingProxyType({
+    "entry": [{
+        "content": {
+            "version": "9.0.0",
+            "build": "12345",
+            "serverName": "test-splunk",
+            "host": "test-splunk.com",
+            "product_type": "enterprise",
+            "license_state": "OK",
+            "mode": "normal",
+            "startup_time": "2024-01-01T00:00:00"
+        }
+    }]
+})
+
+# (method, kwargs, mocked REST response, expected fields of each returned row)
+LISTING_CASES = [
+    pytest.param(
+        "list_indexes",
+        {},
+        _MAIN_INDEXES_RESP,
+        [{"name": "main", "currentDBSizeMB": 1024.5}, {"name": "security"}],
+        id="list_indexes",
+    ),
+    pytest.param(
+        "list_indexes",
+        {"pattern": "main*"},
+        _PATTERN_INDEXES_RESP,
+        # Should only return indexes matching the pattern
+        [{"name": "main"}],
+        id="list_indexes_with_pattern",
+    ),
+    pytest.param(
+        "list_saved_searches",
+        {},
+        _SAVED_SEARCHES_RESP,
+        [{"name": "Security Alerts", "search": "index=security error", "owner": "admin"}],
+        id="list_saved_searches",
+    ),
+    pytest.param(
+        "get_server_info",
+        {},
+        _SERVER_INFO_RESP,
+        {"version": "9.0.0", "serverName": "test-splunk", "product_type": "enterprise"},
+        id="get_server_info",
+    ),
+]
 
 
 class TestSplunkClient:
     """Test cases for SplunkClient"""
 
-    @pytest.mark.asyncio
-    async def test_init(self, mock_config):
+    async def test_init(self, mock_config, fresh_client):
         """Test client initialization"""
-        client = SplunkClient(mock_config)
+        client = fresh_client
         assert client.config == mock_config
         assert client.session is None
         assert client.session_key is None
         assert client.base_url == "https://test-splunk.com:8089"
 
-    @pytest.mark.asyncio
-    async def test_connect_token_auth(self, mock_config):
+    async def test_connect_token_auth(self, fresh_client):
         """Test connection with token authentication"""
-        client = SplunkClient(mock_config)
+        client = fresh_client
         
-        # Mock the HTTP session and response
-        mock_response = AsyncMock()
-        mock_response.status = 200
-        mock_response.json = AsyncMock(return_value={})
+        await client.connect()
         
-        with patch('aiohttp.ClientSession') as mock_session_class:
-            mock_session = AsyncMock()
-            mock_session.get = AsyncMock(return_value=mock_response)
-            mock_session.headers = {}
-            mock_session_class.return_value = mock_session
-            
-            await client.connect()
-            
-            assert client.session is not None
-            assert "Authorization" in mock_session.headers
-            assert mock_session.headers["Authorization"] == "Bearer test-token"
+        assert client.session is not None
+        assert "Authorization" in client.session.headers
+        assert client.session.headers["Authorization"] == "Bearer test-token"
+
+    @pytest.mark.mock_response(401, text="Unauthorized")
+    async def test_connect_token_auth_deferred(self, fresh_client):
+        """Test token validation is skipped on connect by default"""
+        client = fresh_client
+        
+        # Any request would be answered with a 401, so connecting succeeds
+        # only if no validation round trip is made
+        await client.connect()
+        
+        assert client.session.headers["Authorization"] == "Bearer test-token"
 
-    @pytest.mark.asyncio
+    @pytest.mark.mock_response(200, {"sessionKey": "test-session-key"})
     async def test_connect_userpass_auth(self, mock_config_userpass):
         """Test connection with username/password authentication"""
         client = SplunkClient(mock_config_userpass)
         
-        # Mock successful authentication response
-        mock_auth_response = AsyncMock()
-        mock_auth_response.status = 200
-        mock_auth_response.json = AsyncMock(return_value={"sessionKey": "test-session-key"})
+        await client.connect()
         
-        with patch('aiohttp.ClientSession') as mock_session_class:
-            mock_session = AsyncMock()
-            mock_session.post = AsyncMock(return_value=mock_auth_response)
-            mock_session.headers = {}
-            mock_session_class.return_value = mock_session
-            
-            await client.connect()
-            
-            assert client.session is not None
-            assert client.session_key == "test-session-key"
-            assert "Authorization" in mock_session.headers
-            assert mock_session.headers["Authorization"] == "Splunk test-session-key"
+        assert client.session is not None
+        assert client.session_key == "test-session-key"
+        assert "Authorization" in client.session.headers
+        assert client.session.headers["Authorization"] == "Splunk test-session-key"
 
-    @pytest.mark.asyncio
     async def test_search_success(self, splunk_client):
         """Test successful search execution"""
         # Mock the search workflow
-        job_response = {"sid": "test-search-id"}
-        status_response = {
-            "entry": [{
-                "content": {"dispatchState": "DONE"}
-            }]
-        }
-        results_response = {
-            "results": [
-                {"_time": "2024-01-01T00:00:00", "_raw": "test log entry"}
-            ],
-            "messages": []
-        }
+        responses = staged_requests([
+            _JOB_RESP,             # Create job
+            _JOB_DONE_RESP,        # Check status
+            _SEARCH_RESULTS_RESP,  # Get results
+            _EMPTY_RESP            # Delete job
+        ])
         
-        with patch.object(splunk_client, '_make_request') as mock_request:
-            mock_request.side_effect = [
-                job_response,      # Create job
-                status_response,   # Check status
-                results_response,  # Get results
-                {}                 # Delete job
-            ]
-            
+        with swap(splunk_client, '_make_request', responses):
             result = await splunk_client.search(
                 query="search index=main",
                 earliest_time="-1h",
                 latest_time="now",
                 max_count=10
             )
+            # Let the background job deletion run against the stand-in too
+            await splunk_client.close()
             
-            assert "results" in result
-            assert len(result["results"]) == 1
-            assert result["results"][0]["_raw"] == "test log entry"
-            assert "search_time" in result
-
-    @pytest.mark.asyncio
-    async def test_list_indexes(self, splunk_client):
-        """Test listing indexes"""
-        mock_response = {
-            "entry": [
-                {
-                    "name": "main",
-                    "content": {
-                        "currentDBSizeMB": 1024.5,
-                        "maxDataSize": "auto",
-                        "totalEventCount": 100000,
-                        "disabled": False
-                    }
-                },
-                {
-                    "name": "security",
-                    "content": {
-                        "currentDBSizeMB": 512.25,
-                        "maxDataSize": "1GB",
-                        "totalEventCount": 50000,
-                        "disabled": False
-                    }
-                }
-            ]
+        assert "results" in result
+        assert len(result["results"]) == 1
+        assert result["results"][0] == {
+            "_time": "2024-01-01T00:00:00",
+            "_raw": "test log entry"
         }
+        assert "search_time" in result
+
+    async def test_search_cacheable(self, splunk_client):
+        """Test repeated cacheable searches are answered from cache"""
+        # Only one search's worth of responses; a second round trip would fail
+        responses = staged_requests([
+            _JOB_RESP,
+            _JOB_DONE_RESP,
+            _SEARCH_RESULTS_RESP,
+            _EMPTY_RESP
+        ])
         
-        with patch.object(splunk_client, '_make_request', return_value=mock_response):
-            indexes = await splunk_client.list_indexes()
+        with swap(splunk_client, '_make_request', responses):
+            first = await splunk_client.search(query="search index=main", cacheable=True)
+            second = await splunk_client.search(query="search index=main", cacheable=True)
             
-            assert len(indexes) == 2
-            assert indexes[0]["name"] == "main"
-            assert indexes[0]["currentDBSizeMB"] == 1024.5
-            assert indexes[1]["name"] == "security"
-
-    @pytest.mark.asyncio
-    async def test_list_indexes_with_pattern(self, splunk_client):
-        """Test listing indexes with pattern filter"""
-        mock_response = {
-            "entry": [
-                {"name": "main", "content": {}},
-                {"name": "security", "content": {}},
-                {"name": "web_logs", "content": {}}
-            ]
-        }
-        
-        with patch.object(splunk_client, '_make_request', return_value=mock_response):
-            indexes = await splunk_client.list_indexes(pattern="main*")
+            assert second == first
+            assert second["results"][0]["_raw"] == "test log entry"
             
-            # Should only return indexes matching the pattern
-            assert len(indexes) == 1
-            assert indexes[0]["name"] == "main"
-
-    @pytest.mark.asyncio
-    async def test_list_saved_searches(self, splunk_client):
-        """Test listing saved searches"""
-        mock_response = {
-            "entry": [
-                {
-                    "name": "Security Alerts",
-                    "author": "admin",
-                    "content": {
-                        "search": "index=security error",
-                        "description": "Security error monitoring",
-                        "disabled": False,
-                        "cron_schedule": "0 */6 * * *",
-                        "next_scheduled_time": "2024-01-01T06:00:00"
-                    },
-                    "acl": {"app": "search"}
-                }
-            ]
-        }
-        
-        with patch.object(splunk_client, '_make_request', return_value=mock_response):
-            searches = await splunk_client.list_saved_searches()
+            # Callers get their own copy, never the cached result itself
+            first["results"][0]["_raw"] = "MUTATED"
+            first["results"].append({"_raw": "extra"})
+            third = await splunk_client.search(query="search index=main", cacheable=True)
+            await splunk_client.close()
             
-            assert len(searches) == 1
-            assert searches[0]["name"] == "Security Alerts"
-            assert searches[0]["search"] == "index=security error"
-            assert searches[0]["owner"] == "admin"
-
-    @pytest.mark.asyncio
-    async def test_get_server_info(self, splunk_client):
-        """Test getting server information"""
-        mock_response = {
-            "entry": [{
-                "content": {
-                    "version": "9.0.0",
-                    "build": "12345",
-                    "serverName": "test-splunk",
-                    "host": "test-splunk.com",
-                    "product_type": "enterprise",
-                    "license_state": "OK",
-                    "mode": "normal",
-                    "startup_time": "2024-01-01T00:00:00"
-                }
-            }]
-        }
+        assert third["results"] == [{"_time": "2024-01-01T00:00:00", "_raw": "test log entry"}]
+
+    @pytest.mark.parametrize("method_name,kwargs,mock_response,expected", LISTING_CASES)
+    async def test_listing(self, splunk_client, method_name, kwargs, mock_response, expected):
+        """Test list_*/get_server_info parsing of REST API entries"""
+        with swap(splunk_client, '_make_request', staged_requests([mock_response])):
+            result = await getattr(splunk_client, method_name)(**kwargs)
+            
+        # Lists are compared row by row, single objects as a one-row list
+        if isinstance(expected, dict):
+            result, expected = [result], [expected]
+        assert len(result) == len(expected)
+        for row, subset in zip(result, expected):
+            assert {key: row[key] for key in subset} == subset
+
+    @pytest.mark.parametrize("method_name,kwargs,expected_search", [
+        pytest.param("list_indexes", {"pattern": "web*"}, "name=web*", id="index_glob"),
+        pytest.param("list_indexes", {"pattern": "web_?"}, None, id="index_glob_unsupported"),
+        pytest.param(
+            "list_saved_searches",
+            {"search_name": 'say "hi" \\ bye'},
+            'name="*say \\"hi\\" \\\\ bye*"',
+            id="saved_search_escaped",
+        ),
+    ])
+    async def test_listing_server_filter(self, splunk_client, method_name, kwargs, expected_search):
+        """Test the name filter passed on to Splunk"""
+        calls = []
+        
+        async def fake_request(method, endpoint, **kwargs):
+            calls.append(kwargs["params"])
+            return _EMPTY_RESP
         
-        with patch.object(splunk_client, '_make_request', return_value=mock_response):
-            server_info = await splunk_client.get_server_info()
+        with swap(splunk_client, '_make_request', fake_request):
+            await getattr(splunk_client, method_name)(**kwargs)
             
-            assert server_info["version"] == "9.0.0"
-            assert server_info["serverName"] == "test-splunk"
-            assert server_info["product_type"] == "enterprise"
+        assert calls[0].get("search") == expected_search
 
-    @pytest.mark.asyncio
+    async def test_get_server_info_cached(self, splunk_client):
+        """Test server information is served from cache within the TTL"""
+        # Only one response is staged, so a second request would fail
+        with swap(splunk_client, '_make_request', staged_requests([_SERVER_INFO_RESP])):
+            first = await splunk_client.get_server_info()
+            second = await splunk_client.get_server_info()
+            
+            assert first == second
+            
+            # Callers get their own copy, never the cached object itself
+            first["version"] = "MUTATED"
+            assert await splunk_client.get_server_info() == second
+
+    async def test_list_apps_cached(self, splunk_client):
+        """Test app listings are cached per visible_only setting"""
+        # One response per visible_only value, so any other request would fail
+        with swap(splunk_client, '_make_request', staged_requests([_APPS_RESP, _APPS_RESP])):
+            visible = await splunk_client.list_apps()
+            visible[0]["label"] = "MUTATED"
+            
+            assert [app["label"] for app in await splunk_client.list_apps()] == ["Search & Reporting"]
+            assert [app["name"] for app in await splunk_client.list_apps(visible_only=False)] == [
+                "search", "splunk_internal"
+            ]
+            assert len(await splunk_client.list_apps(visible_only=False)) == 2
+
+    @pytest.mark.mock_response(401, text="Unauthorized")
     async def test_authentication_error(self, mock_config):
         """Test authentication failure"""
-        client = SplunkClient(mock_config)
-        
-        # Mock failed authentication
-        mock_response = AsyncMock()
-        mock_response.status = 401
-        mock_response.text = AsyncMock(return_value="Unauthorized")
+        client = SplunkClient(dataclasses.replace(mock_config, validate_token_on_connect=True))
         
-        with patch('aiohttp.ClientSession') as mock_session_class:
-            mock_session = AsyncMock()
-            mock_session.get = AsyncMock(return_value=mock_response)
-            mock_session.headers = {}
-            mock_session_class.return_value = mock_session
-            
-            with pytest.raises(Exception, match="Token authentication failed"):
-                await client.connect()
+        with pytest.raises(Exception, match="Token authentication failed"):
+            await client.connect()
 
-    @pytest.mark.asyncio
     async def test_search_timeout(self, splunk_client):
         """Test search timeout handling"""
-        job_response = {"sid": "test-search-id"}
         # Mock status that never completes
-        status_response = {
-            "entry": [{
-                "content": {"dispatchState": "RUNNING"}
-            }]
-        }
+        responses = staged_requests(itertools.chain(
+            [_JOB_RESP],                         # Create job
+            itertools.repeat(_JOB_RUNNING_RESP)  # Check status (always running)
+        ))
         
-        with patch.object(splunk_client, '_make_request') as mock_request:
-            mock_request.side_effect = [
-                job_response,      # Create job
-                status_response,   # Check status (always running)
-            ]
-            
+        with swap(splunk_client, '_make_request', responses):
             with pytest.raises(Exception, match="Search timeout"):
                 await splunk_client.search(
                     query="search index=main",
-                    timeout=1  # Very short timeout
+                    # Fires during the first 50ms backoff sleep, keeping the test fast
+                    timeout=0.01
                 )
 
+    @pytest.mark.parametrize("lifecycle_method", ["close", "connect"])
+    async def test_search_deletes_job_in_background(self, fresh_client, lifecycle_method):
+        """Test the search job is deleted after search() returns and awaited on close/reconnect"""
+        client = fresh_client
+        await client.connect()
+        staged = staged_requests([_JOB_RESP, _JOB_DONE_RESP, _SEARCH_RESULTS_RESP])
+        deleted = []
+        
+        async def fake_request(method, endpoint, **kwargs):
+            if method != "DELETE":
+                return await staged()
+            await asyncio.sleep(0.01)
+            deleted.append(endpoint)
+            return _EMPTY_RESP
+        
+        with swap(client, '_make_request', fake_request):
+            await client.search(query="search index=main")
+            assert deleted == []
+            
+            await getattr(client, lifecycle_method)()
+            
+        assert deleted == ["/services/search/jobs/test-search-id"]
 
-class TestSplunkConfig:
-    """Test cases for SplunkConfig"""
-
-    def test_config_from_env_token(self, monkeypatch):
-        """Test configuration from environment variables with token"""
-        monkeypatch.setenv("SPLUNK_HOST", "test.splunk.com")
-        monkeypatch.setenv("SPLUNK_TOKEN", "test-token")
-        monkeypatch.setenv("SPLUNK_PORT", "8089")
-        monkeypatch.setenv("SPLUNK_SCHEME", "https")
+    async def test_search_delete_failure_logged(self, fresh_client, caplog):
+        """Test a failing job deletion is logged rather than raised"""
+        client = fresh_client
+        staged = staged_requests([_JOB_RESP, _JOB_DONE_RESP, _SEARCH_RESULTS_RESP])
+        
+        async def fake_request(method, endpoint, **kwargs):
+            if method == "DELETE":
+                raise Exception("Splunk API error: 500")
+            return await staged()
         
-        config = SplunkConfig.from_env()
+        with swap(client, '_make_request', fake_request), caplog.at_level(logging.WARNING):
+            result = await client.search(query="search index=main")
+            await client.close()
+            
+        assert len(result["results"]) == 1
+        assert "Failed to delete search job test-search-id: Splunk API error: 500" in caplog.text
+
+    async def test_search_request_timeout_propagates(self, splunk_client):
+        """Test transport timeouts are not reported as a search timeout"""
+        import aiohttp
         
-        assert config.host == "test.splunk.com"
-        assert config.token == "test-token"
-        assert config.port == 8089
-        assert config.scheme == "https"
-
-    def test_config_from_env_userpass(self, monkeypatch):
-        """Test configuration from environment variables with username/password"""
-        monkeypatch.setenv("SPLUNK_HOST", "test.splunk.com")
-        monkeypatch.setenv("SPLUNK_USERNAME", "testuser")
-        monkeypatch.setenv("SPLUNK_PASSWORD", "testpass")
+        staged = staged_requests([_JOB_RESP])
         
-        config = SplunkConfig.from_env()
+        async def fake_request(method, endpoint, **kwargs):
+            if method == "POST":
+                return await staged()
+            raise aiohttp.ServerTimeoutError("Timeout on reading data from socket")
         
-        assert config.host == "test.splunk.com"
-        assert config.username == "testuser"
-        assert config.password == "testpass"
+        with swap(splunk_client, '_make_request', fake_request):
+            with pytest.raises(Exception, match="Request timed out") as excinfo:
+                await splunk_client.search(query="search index=main", timeout=600)
+        assert isinstance(excinfo.value.__cause__, aiohttp.ServerTimeoutError)
 
-    def test_config_missing_host(self, monkeypatch):
-        """Test configuration with missing host"""
-        monkeypatch.delenv("SPLUNK_HOST", raising=False)
+    async def test_search_total_timeout_propagates(self, splunk_client):
+        """Test the session's total request timeout is not reported as a search timeout"""
+        staged = staged_requests([_JOB_RESP])
         
-        with pytest.raises(ValueError, match="SPLUNK_HOST environment variable is required"):
-            SplunkConfig.from_env()
-
-    def test_config_missing_auth(self, monkeypatch):
-        """Test configuration with missing authentication"""
-        monkeypatch.setenv("SPLUNK_HOST", "test.splunk.com")
-        monkeypatch.delenv("SPLUNK_TOKEN", raising=False)
-        monkeypatch.delenv("SPLUNK_USERNAME", raising=False)
-        monkeypatch.delenv("SPLUNK_PASSWORD", raising=False)
+        # ClientTimeout(total=...) raises a bare asyncio.TimeoutError
+        async def fake_request(method, endpoint, **kwargs):
+            if method == "POST":
+                return await staged()
+            raise asyncio.TimeoutError()
         
-        with pytest.raises(ValueError, match="Either SPLUNK_TOKEN or both SPLUNK_USERNAME"):
-            SplunkConfig.from_env()
+        with swap(splunk_client, '_make_request', fake_request):
+            with pytest.raises(Exception, match="Request timed out while polling search job test-search-id"):
+                await splunk_client.search(query="search index=main", timeout=600)